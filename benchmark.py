@@ -0,0 +1,384 @@
+"""Load test for the library API.
+
+Provisions synthetic colleges through POST /college/, seeds them through the
+bulk endpoints, then drives a mixed workload at a fixed concurrency and
+writes throughput, latency percentiles and DB figures to a JSON file.
+
+    python benchmark.py --colleges 3 --students 2000 --books 5000 \\
+        --issues 1000 --exam-scores 500 --concurrency 32 --duration 60 \\
+        --output results/run.json --compare results/baseline.json
+
+Runs are reproducible for a given --seed. --pg-dsn samples connection
+counts from pg_stat_activity while the workload runs.
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+# Relative weights of the workload operations
+WORKLOAD = {
+    "issue_return": 15,
+    "list_books": 20,
+    "list_issued": 15,
+    "list_students": 10,
+    "dashboard": 15,
+    "analytics": 15,
+    "ranking": 10,
+}
+SUBJECTS = ["hindi", "english", "maths", "science", "social_science"]
+
+
+class Api:
+    def __init__(self, base_url: str, timeout: float):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def call(self, method: str, path: str, headers: dict = None, body=None, content_type: str = "application/json"):
+        """Return (status, parsed body, seconds)."""
+        data = None
+        headers = dict(headers or {})
+        if body is not None:
+            data = body.encode() if isinstance(body, str) else json.dumps(body).encode()
+            headers["Content-Type"] = content_type
+
+        request = urllib.request.Request(self.base_url + path, data=data, headers=headers, method=method)
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                status, payload = response.status, response.read()
+        except urllib.error.HTTPError as e:
+            status, payload = e.code, e.read()
+        elapsed = time.perf_counter() - started
+
+        try:
+            parsed = json.loads(payload) if payload else None
+        except ValueError:
+            parsed = payload.decode(errors="replace")
+        return status, parsed, elapsed
+
+    def expect(self, method: str, path: str, headers: dict = None, body=None, content_type: str = "application/json"):
+        status, parsed, _ = self.call(method, path, headers, body, content_type)
+        if status >= 300:
+            raise RuntimeError(f"{method} {path} failed with {status}: {parsed}")
+        return parsed
+
+
+def super_admin_headers(args):
+    return {"username": args.super_admin_username, "password": args.super_admin_password}
+
+
+def provision_college(api: Api, args, name: str):
+    college_id = api.expect("POST", "/college/", super_admin_headers(args), {"name": name})["college_id"]
+    deadline = time.monotonic() + args.provision_timeout
+    while True:
+        status = api.expect("GET", f"/college/{college_id}/status", super_admin_headers(args))
+        if status["status"] == "active":
+            break
+        if status["status"] != "provisioning" or time.monotonic() > deadline:
+            raise RuntimeError(f"College {name} did not come online: {status}")
+        time.sleep(0.1)
+
+    api.expect("POST", f"/auth/create-admin?username=admin&password=admin&college_id={college_id}", {
+        "super-admin-username": args.super_admin_username,
+        "super-admin-password": args.super_admin_password,
+    })
+    token = api.expect("POST", "/auth/login", {
+        "username": "admin", "password": "admin", "x-college-id": str(college_id)
+    })["access_token"]
+    return {"college_id": college_id, "name": name, "headers": {
+        "x-college-id": str(college_id), "Authorization": f"Bearer {token}"
+    }}
+
+
+def seed_college(api: Api, args, college: dict, rng: random.Random):
+    headers = college["headers"]
+    api.expect("POST", "/department/?name=Bench", headers)
+
+    lines = ["name,email,phone,year,semester,academic_session,department_name"]
+    for i in range(args.students):
+        # Ten digits (the API's rule) that still fit Student.phone's int4 column
+        lines.append(f"student{i},bench{college['college_id']}_{i}@gmail.com,1{i:09d},{i % 3 + 1},,2025-26,Bench")
+    report = api.expect("POST", "/Student/import", headers, "\n".join(lines), "text/csv")
+    if report["failed"] or report["inserted"] != args.students:
+        raise RuntimeError(f"Student import for college {college['college_id']} failed: {report}")
+    students = list_students(api, headers, args.students)
+    student_ids = [student["id"] for student in students]
+
+    book_ids = api.expect("POST", "/Book/bulk", headers, [{"title": f"Book {i}"} for i in range(args.books)])["ids"]
+
+    issued = 0
+    attempted = 0
+    while attempted < args.issues:
+        size = min(1000, args.issues - attempted)
+        items = [{
+            "student_id": rng.choice(student_ids),
+            "book_id": rng.choice(book_ids),
+            "due_date": (date.today() + timedelta(days=rng.randint(-30, 30))).isoformat(),
+        } for _ in range(size)]
+        batch = api.expect("POST", "/IssuedBook/batch", headers, {"items": items})
+        # Random pairs can repeat; anything else means the seed data is broken
+        errors = {result["detail"] for result in batch["results"] if result["status"] != "issued"}
+        if errors - {"Book already issued"}:
+            raise RuntimeError(f"Issuing books for college {college['college_id']} failed: {errors}")
+        issued += batch["issued"]
+        attempted += size
+
+    scores = [
+        {"student_id": student["id"], "exam_type": "final", "year": student["year"],
+         **{subject: rng.randint(30, 100) for subject in SUBJECTS}}
+        for student in students[:args.exam_scores]
+    ]
+    with ThreadPoolExecutor(max_workers=args.seed_concurrency) as pool:
+        list(pool.map(lambda score: api.expect("POST", "/exam/", headers, score), scores))
+
+    college["student_ids"] = student_ids
+    college["book_ids"] = book_ids
+    return {"students": report["inserted"], "books": len(book_ids), "issues": issued, "exam_scores": min(args.exam_scores, len(student_ids))}
+
+
+def list_students(api: Api, headers: dict, wanted: int):
+    students = []
+    after_id = None
+    while len(students) < wanted:
+        suffix = f"&after_id={after_id}" if after_id is not None else ""
+        rows = api.expect("GET", "/Student/?limit=1000" + suffix, headers)
+        if not rows:
+            break
+        students.extend(rows)
+        after_id = rows[-1]["id"]
+    return students
+
+
+def run_operation(api: Api, college: dict, operation: str, rng: random.Random):
+    """Run one workload operation; returns a list of (name, status, seconds)."""
+    headers = college["headers"]
+    if operation == "issue_return":
+        status, issue, seconds = api.call("POST", "/IssuedBook/", headers, {
+            "student_id": rng.choice(college["student_ids"]),
+            "book_id": rng.choice(college["book_ids"]),
+            "due_date": (date.today() + timedelta(days=14)).isoformat(),
+        })
+        results = [("issue", status, seconds)]
+        if status < 300:
+            status, _, seconds = api.call("PUT", f"/IssuedBook/{issue['id']}/return", headers)
+            results.append(("return", status, seconds))
+        return results
+
+    path = {
+        "list_books": "/Book/?limit=100",
+        "list_issued": "/IssuedBook/?limit=100",
+        "list_students": "/Student/?limit=100",
+        "dashboard": "/dashboard/",
+        "analytics": "/analytics/top-books",
+        "ranking": "/exam/ranking",
+    }[operation]
+    status, _, seconds = api.call("GET", path, headers)
+    return [(operation, status, seconds)]
+
+
+def percentile(sorted_values: list, fraction: float):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def summarize(samples: list):
+    latencies = sorted(seconds * 1000 for _, seconds in samples)
+    errors = sum(1 for status, _ in samples if status >= 400)
+    return {
+        "count": len(samples),
+        "errors": errors,
+        "mean_ms": round(sum(latencies) / len(latencies), 2) if latencies else None,
+        "p50_ms": round(percentile(latencies, 0.50), 2) if latencies else None,
+        "p95_ms": round(percentile(latencies, 0.95), 2) if latencies else None,
+        "p99_ms": round(percentile(latencies, 0.99), 2) if latencies else None,
+        "max_ms": round(latencies[-1], 2) if latencies else None,
+    }
+
+
+def run_workload(api: Api, args, colleges: list):
+    samples = {}
+    lock = threading.Lock()
+    operations = list(WORKLOAD)
+    weights = [WORKLOAD[name] for name in operations]
+    deadline = time.monotonic() + args.duration
+
+    def worker(number: int):
+        rng = random.Random(args.seed * 1000 + number)
+        local = {}
+        while time.monotonic() < deadline:
+            college = rng.choice(colleges)
+            operation = rng.choices(operations, weights)[0]
+            for name, status, seconds in run_operation(api, college, operation, rng):
+                local.setdefault(name, []).append((status, seconds))
+        with lock:
+            for name, values in local.items():
+                samples.setdefault(name, []).extend(values)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(worker, range(args.concurrency)))
+    return samples, time.perf_counter() - started
+
+
+class ConnectionSampler(threading.Thread):
+    """Polls pg_stat_activity for connection counts while the workload runs."""
+
+    def __init__(self, dsn: str, interval: float = 1.0):
+        super().__init__(daemon=True)
+        self.dsn = dsn
+        self.interval = interval
+        self.samples = []
+        self.stopped = threading.Event()
+
+    def run(self):
+        import psycopg2
+
+        conn = psycopg2.connect(self.dsn)
+        conn.autocommit = True
+        cursor = conn.cursor()
+        while not self.stopped.wait(self.interval):
+            cursor.execute("SELECT count(*), count(*) FILTER (WHERE state = 'active') FROM pg_stat_activity")
+            self.samples.append(cursor.fetchone())
+        conn.close()
+
+    def summary(self):
+        if not self.samples:
+            return None
+        return {
+            "max_connections": max(total for total, _ in self.samples),
+            "mean_connections": round(sum(total for total, _ in self.samples) / len(self.samples), 1),
+            "max_active": max(active for _, active in self.samples),
+        }
+
+
+def scrape_statement_total(api: Api):
+    """Sum of library_db_statements_total from /metrics, or None if unavailable."""
+    status, text, _ = api.call("GET", "/metrics")
+    if status != 200 or not isinstance(text, str):
+        return None
+    return sum(
+        float(line.rsplit(" ", 1)[1]) for line in text.splitlines()
+        if line.startswith("library_db_statements_total{")
+    )
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)), stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(result: dict, baseline: dict, tolerance: float):
+    """Operations whose p95 grew by more than ``tolerance`` over the baseline."""
+    regressions = []
+    for name, current in result["operations"].items():
+        previous = baseline.get("operations", {}).get(name)
+        if not previous or not previous.get("p95_ms") or current["p95_ms"] is None:
+            continue
+        change = current["p95_ms"] / previous["p95_ms"] - 1
+        if change > tolerance:
+            regressions.append({"operation": name, "baseline_p95_ms": previous["p95_ms"], "p95_ms": current["p95_ms"], "change": round(change, 3)})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the library API with synthetic colleges")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--super-admin-username", default="nitya")
+    parser.add_argument("--super-admin-password", default="1234")
+    parser.add_argument("--colleges", type=int, default=3)
+    parser.add_argument("--students", type=int, default=1000)
+    parser.add_argument("--books", type=int, default=2000)
+    parser.add_argument("--issues", type=int, default=1000)
+    parser.add_argument("--exam-scores", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seed-concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=30, help="seconds of mixed workload")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--timeout", type=float, default=30, help="per-request timeout in seconds")
+    parser.add_argument("--provision-timeout", type=float, default=120)
+    parser.add_argument("--pg-dsn", help="sample pg_stat_activity through this DSN")
+    parser.add_argument("--output", default="benchmark-results.json")
+    parser.add_argument("--compare", help="baseline result file to check p95 regressions against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed p95 growth over the baseline")
+    parser.add_argument("--keep", action="store_true", help="do not delete the synthetic colleges afterwards")
+    args = parser.parse_args()
+
+    api = Api(args.base_url, args.timeout)
+    rng = random.Random(args.seed)
+    run_id = f"{datetime.utcnow():%Y%m%d%H%M%S}"
+
+    colleges = []
+    try:
+        setup_started = time.perf_counter()
+        for k in range(args.colleges):
+            college = provision_college(api, args, f"bench {run_id} {k}")
+            college["seeded"] = seed_college(api, args, college, rng)
+            colleges.append(college)
+            print(f"college {college['college_id']} ready: {college['seeded']}", file=sys.stderr)
+        setup_seconds = time.perf_counter() - setup_started
+
+        sampler = ConnectionSampler(args.pg_dsn) if args.pg_dsn else None
+        if sampler:
+            sampler.start()
+        statements_before = scrape_statement_total(api)
+        samples, elapsed = run_workload(api, args, colleges)
+        statements_after = scrape_statement_total(api)
+        if sampler:
+            sampler.stopped.set()
+            sampler.join()
+    finally:
+        if not args.keep:
+            for college in colleges:
+                api.call("DELETE", f"/college/{college['college_id']}", super_admin_headers(args))
+
+    requests = sum(len(values) for values in samples.values())
+    result = {
+        "started_at": run_id,
+        "git_commit": git_commit(),
+        "config": {key: value for key, value in vars(args).items() if "password" not in key},
+        "setup_seconds": round(setup_seconds, 2),
+        "duration_seconds": round(elapsed, 2),
+        "requests": requests,
+        "throughput_rps": round(requests / elapsed, 1) if elapsed else None,
+        "overall": summarize([sample for values in samples.values() for sample in values]),
+        "operations": {name: summarize(values) for name, values in sorted(samples.items())},
+        "db": {
+            "statements_per_request": (
+                round((statements_after - statements_before) / requests, 2)
+                if requests and statements_before is not None and statements_after is not None else None
+            ),
+            "connections": sampler.summary() if sampler else None,
+        },
+    }
+
+    if args.compare:
+        with open(args.compare) as f:
+            result["regressions"] = compare(result, json.load(f), args.tolerance)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(result, f, indent=2)
+    print(json.dumps({key: result[key] for key in ("throughput_rps", "overall", "operations", "db")}, indent=2))
+
+    if result.get("regressions"):
+        print(f"p95 regressions over {args.tolerance:.0%}: {json.dumps(result['regressions'])}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
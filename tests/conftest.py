@@ -0,0 +1,157 @@
+"""Run the API against SQLite files instead of Postgres.
+
+Every ``create_engine`` URL is mapped to ``<tmp>/<database name>.db`` before
+``main`` is imported, and the psycopg2 admin connection used for
+CREATE/DROP/RENAME DATABASE and advisory locks copies, deletes and renames
+those files. Set ``DB_MODE=async`` to run the same tests on the async routers.
+Needs pytest, httpx and (for async mode) aiosqlite.
+"""
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+
+import psycopg2
+import pytest
+import sqlalchemy
+import sqlalchemy.ext.asyncio
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+DB_DIR = tempfile.mkdtemp(prefix="library-tests-")
+SUPER_ADMIN = {"username": "nitya", "password": "1234"}
+
+os.environ.setdefault("SESSION_SECRET", "test-secret")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def sqlite_url(url, driver: str = "sqlite"):
+    return f"{driver}:///{DB_DIR}/{str(url).rsplit('/', 1)[-1]}.db"
+
+
+def without_pool_sizing(kwargs: dict):
+    return {key: value for key, value in kwargs.items() if key not in ("pool_size", "max_overflow")}
+
+
+real_create_engine = sqlalchemy.create_engine
+real_create_async_engine = sqlalchemy.ext.asyncio.create_async_engine
+
+
+def create_sqlite_engine(url, **kwargs):
+    kwargs = without_pool_sizing(kwargs)
+    kwargs.setdefault("poolclass", QueuePool)
+    return real_create_engine(sqlite_url(url), **kwargs)
+
+
+def create_async_sqlite_engine(url, **kwargs):
+    kwargs = without_pool_sizing(kwargs)
+    kwargs.setdefault("poolclass", AsyncAdaptedQueuePool)
+    return real_create_async_engine(sqlite_url(url, "sqlite+aiosqlite"), **kwargs)
+
+
+held_advisory_locks = set()
+
+
+class AdminCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.rows = []
+
+    def execute(self, sql: str, params=()):
+        self.rows = []
+        if "pg_locks" in sql:
+            self.rows = [(params[0] in held_advisory_locks,)]
+        elif "pg_try_advisory_lock" in sql:
+            acquired = params[0] not in held_advisory_locks
+            if acquired:
+                held_advisory_locks.add(params[0])
+                self.conn.locks.append(params[0])
+            self.rows = [(acquired,)]
+        elif "pg_advisory_lock" in sql:
+            self.rows = [(True,)]
+        elif "pg_database" in sql:
+            prefix = params[0][:-1].replace("\\_", "_").replace("\\%", "%").replace("\\\\", "\\")
+            self.rows = sorted(
+                (name[:-3],) for name in os.listdir(DB_DIR) if name.endswith(".db") and name.startswith(prefix)
+            )
+        elif match := re.search(r'DROP DATABASE IF EXISTS "(.+?)"', sql):
+            path = f"{DB_DIR}/{match.group(1)}.db"
+            if os.path.exists(path):
+                os.remove(path)
+        elif match := re.search(r'CREATE DATABASE "(.+?)" TEMPLATE "(.+?)"', sql):
+            shutil.copy(f"{DB_DIR}/{match.group(2)}.db", f"{DB_DIR}/{match.group(1)}.db")
+        elif match := re.search(r'ALTER DATABASE "(.+?)" RENAME TO "(.+?)"', sql):
+            os.rename(f"{DB_DIR}/{match.group(1)}.db", f"{DB_DIR}/{match.group(2)}.db")
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+
+class AdminConnection:
+    autocommit = False
+
+    def __init__(self):
+        self.locks = []
+
+    def cursor(self):
+        return AdminCursor(self)
+
+    def close(self):
+        for key in self.locks:
+            held_advisory_locks.discard(key)
+        self.locks = []
+
+
+sqlalchemy.create_engine = create_sqlite_engine
+psycopg2.connect = lambda *args, **kwargs: AdminConnection()
+
+import main  # noqa: E402
+
+main.create_async_engine = create_async_sqlite_engine
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(main.app) as client:
+        yield client
+
+
+def wait_until_active(client, college_id: int, timeout: float = 10):
+    deadline = time.monotonic() + timeout
+    while True:
+        status = client.get(f"/college/{college_id}/status", headers=SUPER_ADMIN).json()
+        if status["status"] != main.COLLEGE_STATUS_PROVISIONING or time.monotonic() > deadline:
+            return status
+        time.sleep(0.02)
+
+
+@pytest.fixture
+def college(client, request):
+    """A fresh active college with an admin; returns its id and bearer headers."""
+    name = re.sub(r"\W", "_", request.node.name)
+    response = client.post("/college/", json={"name": name}, headers=SUPER_ADMIN)
+    assert response.status_code == 202, response.text
+    college_id = response.json()["college_id"]
+    assert wait_until_active(client, college_id)["status"] == main.COLLEGE_STATUS_ACTIVE
+
+    client.post("/auth/create-admin", params={"username": "admin", "password": "admin", "college_id": college_id}, headers={
+        "super-admin-username": SUPER_ADMIN["username"],
+        "super-admin-password": SUPER_ADMIN["password"],
+    })
+    credentials = {"x-college-id": str(college_id), "username": "admin", "password": "admin"}
+    token = client.post("/auth/login", headers=credentials).json()["access_token"]
+    # Not deleted afterwards: SQLite would hand the id to the next college
+    return {
+        "id": college_id,
+        "credentials": credentials,
+        "headers": {"x-college-id": str(college_id), "authorization": f"Bearer {token}"},
+    }
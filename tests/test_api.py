@@ -0,0 +1,250 @@
+import base64
+import csv
+import json
+from datetime import date, timedelta
+
+import pytest
+
+import main
+from conftest import SUPER_ADMIN
+
+STUDENT_COLUMNS = "name,email,phone,year,semester,academic_session,department_name"
+
+
+def chunked(body: str, size: int):
+    data = body.encode()
+    return iter([data[i:i + size] for i in range(0, len(data), size)])
+
+
+def import_students(client, college, body: str, chunk_size: int = 1000):
+    headers = {**college["headers"], "content-type": "text/csv"}
+    response = client.post("/Student/import", content=chunked(body, chunk_size), headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def seed_students(client, college, count: int):
+    client.post("/department/", params={"name": "CS"}, headers=college["headers"])
+    lines = [STUDENT_COLUMNS] + [
+        f"student{i},student{i}@gmail.com,{1000000000 + i},{i % 3 + 1},,2025-26,CS" for i in range(count)
+    ]
+    report = import_students(client, college, "\n".join(lines) + "\n")
+    assert report["inserted"] == count, report
+    return [student["id"] for student in client.get("/Student/", headers=college["headers"]).json()]
+
+
+def seed_books(client, college, titles):
+    response = client.post("/Book/bulk", json=[{"title": title} for title in titles], headers=college["headers"])
+    assert response.status_code == 200, response.text
+    return response.json()["ids"]
+
+
+# Sessions and principal resolution
+
+def test_login_token_authenticates(client, college):
+    response = client.post("/Book/", json={"title": "Dune"}, headers=college["headers"])
+    assert response.status_code == 200, response.text
+
+    main.principal_cache._entries.clear()
+    assert client.get("/Student/", headers=college["headers"]).status_code == 200
+
+
+def test_department_list_accepts_session_token(client, college):
+    client.post("/department/", params={"name": "CS"}, headers=college["headers"])
+
+    for headers in (college["headers"], college["credentials"], {**SUPER_ADMIN, "x-college-id": str(college["id"])}):
+        response = client.get("/department/all", headers=headers)
+        assert response.status_code == 200, response.text
+        assert [department["name"] for department in response.json()] == ["CS"]
+
+
+@pytest.mark.parametrize("token", [
+    "not-a-token",
+    "abc.éé",
+    "e30.0000",
+])
+def test_malformed_tokens_are_rejected(client, college, token):
+    headers = {"x-college-id": str(college["id"]), "authorization": f"Bearer {token}".encode("latin-1")}
+    assert client.get("/Student/", headers=headers).status_code == 401
+
+
+def test_tampered_token_is_rejected(client, college):
+    payload, _, signature = college["headers"]["authorization"].partition(".")
+    forged = f"{payload}.{'0' * len(signature)}"
+    assert client.get("/Student/", headers={**college["headers"], "authorization": forged}).status_code == 401
+
+
+def test_token_without_required_claims_is_rejected():
+    payload = base64.urlsafe_b64encode(json.dumps({"exp": 4102444800}).encode())
+    with pytest.raises(main.HTTPException) as error:
+        main.decode_session_token(f"{payload.decode()}.{main._sign(payload)}")
+    assert error.value.status_code == 401
+
+
+def test_replacing_admin_revokes_sessions(client, college):
+    client.post("/auth/create-admin", params={"username": "admin", "password": "changed", "college_id": college["id"]}, headers={
+        "super-admin-username": SUPER_ADMIN["username"],
+        "super-admin-password": SUPER_ADMIN["password"],
+    })
+    assert client.get("/Student/", headers=college["headers"]).status_code == 401
+
+
+# Student listing
+
+def test_student_list_uses_keyset_pages_and_filters(client, college):
+    student_ids = seed_students(client, college, 5)
+    headers = college["headers"]
+
+    first = client.get("/Student/", params={"limit": 2}, headers=headers).json()
+    second = client.get("/Student/", params={"limit": 2, "after_id": first[-1]["id"]}, headers=headers).json()
+    assert [student["id"] for student in first + second] == student_ids[:4]
+    assert {student["department_name"] for student in first} == {"CS"}
+
+    second_years = client.get("/Student/", params={"year": 2}, headers=headers).json()
+    assert {student["year"] for student in second_years} == {2}
+    assert client.get("/Student/", params={"department": "Physics"}, headers=headers).json() == []
+
+    student = client.get(f"/Student/{student_ids[0]}", headers=headers).json()
+    assert student["department_name"] == "CS"
+
+
+# Book and issued book pagination
+
+def test_book_list_follows_next_cursor(client, college):
+    book_ids = seed_books(client, college, [f"Book {i}" for i in range(5)])
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        page = client.get("/Book/", params=params, headers=college["headers"]).json()
+        seen.extend(book["id"] for book in page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == book_ids
+
+    too_large = client.get("/Book/", params={"limit": main.MAX_PAGE_SIZE + 1}, headers=college["headers"])
+    assert too_large.status_code == 422
+
+
+def test_issued_books_filter_and_delayed(client, college):
+    student_ids = seed_students(client, college, 2)
+    book_ids = seed_books(client, college, ["A", "B"])
+    overdue = (date.today() - timedelta(days=3)).isoformat()
+    upcoming = (date.today() + timedelta(days=3)).isoformat()
+    client.post("/IssuedBook/batch", json={"items": [
+        {"student_id": student_ids[0], "book_id": book_ids[0], "due_date": overdue},
+        {"student_id": student_ids[1], "book_id": book_ids[1], "due_date": upcoming},
+    ]}, headers=college["headers"])
+
+    page = client.get("/IssuedBook/", params={"student_id": student_ids[1]}, headers=college["headers"]).json()
+    assert [issue["book_id"] for issue in page["items"]] == [book_ids[1]]
+    delayed = client.get("/IssuedBook/delayed", headers=college["headers"]).json()
+    assert [issue["book_id"] for issue in delayed["items"]] == [book_ids[0]]
+
+
+# Streaming CSV import
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 1000])
+def test_student_import_handles_quoted_newlines_and_bad_rows(client, college, chunk_size):
+    client.post("/department/", params={"name": "CS"}, headers=college["headers"])
+    body = (
+        f"{STUDENT_COLUMNS}\r\n"
+        '"multi\r\nline ""q""",m@gmail.com,1234567890,1,,2025-26,CS\r\n'
+        "\r\n"
+        "plain,p@gmail.com,1234567891,2,,2025-26,CS\r\n"
+        "bad,not-an-email,1234567892,2,,2025-26,CS\r\n"
+        "lost,l@gmail.com,1234567893,2,,2025-26,Physics\r\n"
+    )
+    report = import_students(client, college, body, chunk_size)
+
+    assert (report["inserted"], report["failed"]) == (2, 2)
+    assert [error["row"] for error in report["errors"]] == [4, 5]
+    names = [student["name"] for student in client.get("/Student/", headers=college["headers"]).json()]
+    assert names == ['multi\r\nline "q"', "plain"]
+
+
+def test_malformed_csv_record_is_a_row_error(client, college):
+    limit = csv.field_size_limit()
+    csv.field_size_limit(20)
+    try:
+        response = client.post(
+            "/Book/bulk", content="title\nshort\n" + "x" * 50 + "\nafter\n",
+            headers={**college["headers"], "content-type": "text/csv"}
+        )
+    finally:
+        csv.field_size_limit(limit)
+
+    rows = response.json()["rows"]
+    assert [sorted(row) for row in rows] == [["id", "row"], ["error", "row"], ["id", "row"]]
+    assert rows[1]["error"].startswith("malformed CSV")
+
+
+# Bulk book ingest
+
+def test_bulk_books_report_every_row(client, college):
+    client.post("/Book/", json={"title": "old"}, headers=college["headers"])
+    response = client.post(
+        "/Book/bulk", params={"dedupe": True},
+        json=[{"title": "a"}, {"title": "old"}, {"title": "a"}, {"title": "b"}, 5],
+        headers=college["headers"]
+    )
+    report = response.json()
+
+    assert (report["received"], report["inserted"], report["duplicates"], report["failed"]) == (5, 2, 2, 1)
+    assert [next(key for key in row if key != "row") for row in report["rows"]] == ["id", "duplicate", "duplicate", "id", "error"]
+    assert report["ids"] == [row["id"] for row in report["rows"] if "id" in row]
+
+
+def test_bulk_books_reject_malformed_json(client, college):
+    response = client.post(
+        "/Book/bulk", content='[{"title": ', headers={**college["headers"], "content-type": "application/json"}
+    )
+    assert response.status_code == 400
+
+
+def test_copy_csv_field_keeps_empty_strings_distinct_from_null():
+    assert main.copy_csv_field(None) == ""
+    assert main.copy_csv_field("") == '""'
+    assert main.copy_csv_field('say "hi"') == '"say ""hi"""'
+    assert main.copy_csv_field(7) == "7"
+
+
+# Batch issue and return
+
+def test_batch_issue_and_return(client, college):
+    student_ids = seed_students(client, college, 2)
+    book_ids = seed_books(client, college, ["A", "B"])
+    overdue = (date.today() - timedelta(days=4)).isoformat()
+    headers = college["headers"]
+
+    issued = client.post("/IssuedBook/batch", json={"items": [
+        {"student_id": student_ids[0], "book_id": book_ids[0], "due_date": overdue},
+        {"student_id": student_ids[0], "book_id": book_ids[0], "due_date": overdue},
+        {"student_id": student_ids[1], "book_id": 999999, "due_date": overdue},
+        {"student_id": student_ids[1], "book_id": book_ids[1], "due_date": overdue},
+    ]}, headers=headers).json()
+    assert (issued["issued"], issued["failed"]) == (2, 2)
+    assert [result["detail"] for result in issued["results"]] == [None, "Book already issued", "Book not found", None]
+
+    issue_ids = [result["issue"]["id"] for result in issued["results"] if result["status"] == "issued"]
+    returned = client.put("/IssuedBook/batch/return", json={"issue_ids": issue_ids + [issue_ids[0]]}, headers=headers).json()
+    assert (returned["returned"], returned["failed"]) == (2, 1)
+    assert returned["total_fine"] == 2 * 4 * main.FINE_PER_DAY
+    assert client.get("/dashboard/", headers=headers).json()["issued_books"] == 0
+
+
+# Conditional list responses
+
+def test_book_list_etag_changes_on_write(client, college):
+    headers = college["headers"]
+    first = client.get("/Book/", headers=headers)
+    etag = first.headers["etag"]
+
+    assert client.get("/Book/", headers={**headers, "if-none-match": etag}).status_code == 304
+
+    client.post("/Book/", json={"title": "New"}, headers=headers)
+    changed = client.get("/Book/", headers={**headers, "if-none-match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert [book["title"] for book in changed.json()["items"]] == ["New"]